@@ -2,9 +2,7 @@
 
 from __future__ import annotations
 
-import json
-import time
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Mapping, Sequence
 
 import scenarios
 import utils
@@ -13,7 +11,7 @@ import utils
 def run_agent(
     system_prompt: str,
     task_prompt: str,
-    tools_schema: List[Dict[str, Any]],
+    tools_schema: Sequence[Mapping[str, Any]],
     cfg: Dict[str, Any],
 ) -> str:
     endpoint = cfg["endpoint"]
@@ -21,50 +19,94 @@ def run_agent(
     timeout = cfg["timeout"]
     temperature = cfg["temperature"]
     max_tokens = cfg["max_tokens"]
+    tool_max_tokens = min(cfg.get("tool_max_tokens") or max_tokens, max_tokens)
     keep_last_screenshots = cfg["keep_last_screenshots"]
     keep_last_thinks = cfg.get("keep_last_thinks", 2)
     max_steps = cfg["max_steps"]
     step_delay = cfg["step_delay"]
+    stream = cfg.get("stream", False)
+    # Only meaningful when streaming: the capture starts when the stream names
+    # observe_screen, i.e. at the end of generation. A request-time capture would hand
+    # observe_screen a frame as old as the whole generation (and a false "unchanged").
+    prefetch = stream and cfg.get("prefetch_screen", False)
+    gzip_requests = cfg.get("gzip_requests", False)
+    max_history_turns = cfg.get("max_history_turns") or (keep_last_screenshots * 2 + keep_last_thinks + 8)
 
     dump_cfg = {
         "dump_dir": cfg["dump_dir"],
         "dump_prefix": cfg["dump_prefix"],
         "dump_idx": cfg["dump_start"],
+        "dump_enabled": cfg.get("dump_enabled", True),
         "target_w": cfg["target_w"],
         "target_h": cfg["target_h"],
+        "settle_delay": step_delay,
+        "image_format": cfg.get("image_format", "png"),
+        "jpeg_quality": cfg.get("jpeg_quality", 85),
+        "auto_observe": cfg.get("auto_observe", False),
     }
 
-    messages: List[Dict[str, Any]] = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": task_prompt},
-    ]
-
-    # Initial screenshot
-    tool_msg, user_msg = scenarios.execute_tool("observe_screen", None, "initial_observation", dump_cfg)
-    messages.append(tool_msg)
-    if user_msg is not None:
-        messages.append(user_msg)
-        messages = utils.prune_old_screenshots(messages, keep_last_screenshots)
-
-    last_content = ""
-
-    for _ in range(max_steps):
-        resp = utils.post_json(
+    store = utils.MessageStore(
+        (
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": task_prompt},
+        ),
+        max_history_turns,
+    )
+
+    def on_tool_name(name: str) -> None:
+        # Start the capture the moment the stream names observe_screen, overlapping
+        # it with the rest of the generation and the response handling.
+        if name == "observe_screen":
+            scenarios.prefetch_screen(dump_cfg)
+
+    # The tools schema is constant for the run: encode it once, splice it into every request.
+    precoded = {"tools": utils.dumps_bytes(tools_schema)}
+
+    def complete(messages: List[Dict[str, Any]], budget: int) -> Dict[str, Any]:
+        return utils.post_json(
             {
                 "model": model_id,
                 "messages": messages,
-                "tools": tools_schema,
                 "tool_choice": "auto",
                 "temperature": temperature,
-                "max_tokens": max_tokens,
+                "max_tokens": budget,
             },
             endpoint,
             timeout,
+            stream=stream,
+            precoded=precoded,
+            on_tool_name=on_tool_name if prefetch else None,
+            compress=gzip_requests,
         )
 
-        msg = resp["choices"][0]["message"]
-        messages.append(msg)
-        messages = utils.prune_old_thinks(messages, keep_last_thinks)
+    # Initial screenshot (always sent in full: drop dedup state from any earlier run)
+    scenarios.reset_state()
+    tool_msg, user_msg = scenarios.execute_tool("observe_screen", None, "initial_observation", dump_cfg)
+    store.new_turn(tool_msg)
+    if user_msg is not None:
+        store.add(user_msg)
+    # A fresh screenshot is the usual lead-in to a (short) tool call.
+    screenshot_turn = user_msg is not None
+
+    last_content = ""
+
+    for _ in range(max_steps):
+        store.prune(keep_last_screenshots, keep_last_thinks)
+        messages = store.messages()
+
+        budget = tool_max_tokens if screenshot_turn else max_tokens
+        choice = complete(messages, budget)["choices"][0]
+        if budget < max_tokens and choice.get("finish_reason") == "length":
+            # The capped budget cut off a longer answer (or a tool call mid-arguments):
+            # redo this turn with the full budget.
+            choice = complete(messages, max_tokens)["choices"][0]
+
+        msg = choice["message"]
+        store.new_turn(msg)
+        if not store.screenshot_count:
+            # The turn holding the last screenshot was evicted: "unchanged" would now
+            # point at an image the model can no longer see.
+            scenarios.forget_last_screen()
 
         if isinstance(msg.get("content"), str):
             last_content = msg["content"]
@@ -76,12 +118,12 @@ def run_agent(
         # Enforce single tool call per step (prevents model spamming tools)
         if len(tool_calls) > 1:
             for extra_tc in tool_calls[1:]:
-                messages.append(
+                store.add(
                     {
                         "role": "tool",
                         "tool_call_id": extra_tc["id"],
                         "name": extra_tc["function"]["name"],
-                        "content": json.dumps({"ok": False, "error": "too_many_tool_calls"}),
+                        "content": utils.dumps_str({"ok": False, "error": "too_many_tool_calls"}),
                     }
                 )
             tool_calls = tool_calls[:1]
@@ -92,12 +134,9 @@ def run_agent(
         call_id = tc["id"]
 
         tool_msg, user_msg = scenarios.execute_tool(name, arg_str, call_id, dump_cfg)
-        messages.append(tool_msg)
-
+        store.add(tool_msg)
         if user_msg is not None:
-            messages.append(user_msg)
-            messages = utils.prune_old_screenshots(messages, keep_last_screenshots)
-
-        time.sleep(step_delay)
+            store.add(user_msg)
+        screenshot_turn = user_msg is not None
 
     return utils.strip_think(last_content)
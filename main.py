@@ -45,27 +45,37 @@ def main() -> None:
         "timeout": utils.get_env_int("LMSTUDIO_TIMEOUT", 240),
         "temperature": utils.get_env_float("LMSTUDIO_TEMPERATURE", 0.6),
         "max_tokens": utils.get_env_int("LMSTUDIO_MAX_TOKENS", 2048),
+        "tool_max_tokens": utils.get_env_int("LMSTUDIO_TOOL_MAX_TOKENS", 512),
         "target_w": utils.get_env_int("AGENT_IMAGE_W", 1536),
         "target_h": utils.get_env_int("AGENT_IMAGE_H", 864),
+        "image_format": utils.get_env_str("AGENT_IMAGE_FORMAT", "jpeg").lower(),
+        "jpeg_quality": utils.get_env_int("AGENT_JPEG_QUALITY", 85),
         "dump_dir": utils.get_env_str("AGENT_DUMP_DIR", "dumps"),
         "dump_prefix": utils.get_env_str("AGENT_DUMP_PREFIX", "screen_"),
         "dump_start": utils.get_env_int("AGENT_DUMP_START", 1),
+        "dump_enabled": utils.get_env_int("AGENT_DUMP_ENABLED", 1) != 0,
         "keep_last_screenshots": utils.get_env_int("AGENT_KEEP_LAST_SCREENSHOTS", 2),
         "keep_last_thinks": utils.get_env_int("AGENT_KEEP_LAST_THINKS", 2),
         "max_steps": utils.get_env_int("AGENT_MAX_STEPS", 10),
+        "max_history_turns": utils.get_env_int("AGENT_MAX_HISTORY_TURNS", 0),
         "step_delay": utils.get_env_float("AGENT_STEP_DELAY", 0.4),
+        "stream": utils.get_env_int("LMSTUDIO_STREAM", 1) != 0,
+        "gzip_requests": utils.get_env_int("LMSTUDIO_GZIP_REQUESTS", 0) != 0,
+        "prefetch_screen": utils.get_env_int("AGENT_PREFETCH_SCREEN", 1) != 0,
+        "auto_observe": utils.get_env_int("AGENT_AUTO_OBSERVE", 1) != 0,
     }
 
-    os.makedirs(cfg["dump_dir"], exist_ok=True)
+    if cfg["dump_enabled"]:
+        os.makedirs(cfg["dump_dir"], exist_ok=True)
 
     # Initialize HTTP logging
     out_dir = Path(__file__).resolve().parent
     log_file = out_dir / f"agent_run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    utils.init_http_logger(log_file)
+    utils.init_http_logger(log_file, utils.get_env_str("AGENT_HTTP_LOG_LEVEL", "INFO"))
     print(f"Logging to: {log_file}")
 
     try:
-        out = run_agent(scenarios.SYSTEM_PROMPT, task_prompt, scenarios.TOOLS_SCHEMA, cfg)
+        out = run_agent(scenarios.system_prompt(cfg["auto_observe"]), task_prompt, scenarios.TOOLS_SCHEMA, cfg)
         if out:
             print(out)
         print(f"\nComplete log saved to: {log_file}")
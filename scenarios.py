@@ -2,10 +2,19 @@
 
 from __future__ import annotations
 
-import base64
+import atexit
+import hashlib
 import os
+import sys
 import time
-from typing import Any, Dict, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+try:
+    import pybase64 as base64  # optional SIMD base64; same b64encode API as stdlib
+except ImportError:
+    import base64
 
 import utils
 import winapi
@@ -19,7 +28,8 @@ TOOLS_SCHEMA = [
             "description": (
                 "Captures the current screen state and returns it as an image. "
                 "Use this to see applications, windows, UI elements, buttons, icons, and text. "
-                "Call this at the start of each decision cycle and after actions to verify results."
+                "Call this whenever you have no current screenshot to decide from (e.g. at the start, "
+                "or to wait for slow changes); follow the operating protocol for when to verify."
             ),
             "parameters": {"type": "object", "properties": {}, "required": []},
         },
@@ -144,211 +154,345 @@ TOOLS_SCHEMA = [
 
 _screen_dimensions = {"width": 1920, "height": 1080}
 
+# image format -> (data URL prefix, dump file extension)
+_IMAGE_FORMATS = {
+    "png": (b"data:image/png;base64,", ".png"),
+    "jpeg": (b"data:image/jpeg;base64,", ".jpg"),
+}
+
+_OBSERVE_MSG = "Screenshot captured. Use normalized coordinates (0-1000). Prefer point clicks: box=[x,y]."
+_UNCHANGED_MSG = (
+    "Screen unchanged since the previous screenshot; it is still current. "
+    "Use normalized coordinates (0-1000)."
+)
+_VERIFY_HINT = " Use observe_screen to verify."
+_ATTACHED_HINT = " The screen after this action is attached; no separate observe_screen needed."
+_UNCHANGED_HINT = " Screen unchanged by this action (the previous screenshot is still current)."
+_USER_TEXT = (
+    "Current screen state. Identify UI elements and provide click targets in normalized "
+    "0-1000 coordinates. Prefer point clicks box=[x,y] for small targets (taskbar icons)."
+)
+
+_ERR_MISSING_LABEL = utils.err_payload("missing_label", "label required")
+_ERR_MISSING_BOX = utils.err_payload("missing_box", "box required")
+_ERR_EMPTY_TEXT = utils.err_payload("empty_text", "text empty or no ASCII chars")
+_ERR_MISSING_KEY = utils.err_payload("missing_key", "key required")
+
+# Fingerprint of the last screenshot sent to the model; identical frames are not resent.
+_last_screen: Dict[str, Any] = {"hash": b"", "file": None}
+
+# Background capture lets the next screenshot be taken while the model is still
+# generating; observe_screen consumes it, any other tool discards it.
+_CAPTURE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screen_capture")
+_prefetched_capture: Optional[Future] = None
+
+# Earliest perf_counter() time a screenshot may be taken: the UI gets
+# dump_cfg["settle_delay"] seconds after each action before it is captured.
+_settle_until = 0.0
+
+
+def _capture_settled(dump_cfg: Dict[str, Any]) -> Tuple[bytes, str, int, int]:
+    """Capture once the settle delay has passed. Returns (image_bytes, format, screen_w, screen_h)."""
+    remaining = _settle_until - time.perf_counter()
+    if remaining > 0:
+        time.sleep(remaining)
+    target_w, target_h = dump_cfg["target_w"], dump_cfg["target_h"]
+    # JPEG is several times smaller to encode, upload and prefill; PNG when Pillow is missing.
+    if dump_cfg.get("image_format", "png") == "jpeg" and winapi.JPEG_AVAILABLE:
+        img, screen_w, screen_h = winapi.capture_screenshot_jpeg(
+            target_w, target_h, dump_cfg.get("jpeg_quality", 85)
+        )
+        return img, "jpeg", screen_w, screen_h
+    img, screen_w, screen_h = winapi.capture_screenshot_png(target_w, target_h)
+    return img, "png", screen_w, screen_h
 
-def execute_tool(
-    tool_name: str,
-    arg_str: Any,
-    call_id: str,
-    dump_cfg: Dict[str, Any],
-) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+
+def prefetch_screen(dump_cfg: Dict[str, Any]) -> None:
+    """Start capturing the screen in the background (no-op if one is pending)."""
+    global _prefetched_capture
+    if _prefetched_capture is None:
+        _prefetched_capture = _CAPTURE_POOL.submit(_capture_settled, dump_cfg)
+
+
+# Screenshot dumps are for post-hoc debugging only; write them off the request path.
+_DUMP_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screen_dump")
+atexit.register(_DUMP_POOL.shutdown, wait=True)
+
+
+# Dump directories created this run (cleared by reset_state): makedirs runs once
+# per directory on the dump worker, not once per screenshot.
+_dump_dirs_made: Set[str] = set()
+
+
+def _write_dump(fn: str, img_bytes: bytes) -> None:
+    dump_dir = os.path.dirname(fn) or "."
+    if dump_dir not in _dump_dirs_made:
+        os.makedirs(dump_dir, exist_ok=True)
+        _dump_dirs_made.add(dump_dir)
+    with open(fn, "wb") as f:
+        f.write(img_bytes)
+
+
+def _report_dump_error(fut: Future) -> None:
+    # Writes run detached from the agent loop, so surface failures (disk full,
+    # bad AGENT_DUMP_DIR) here instead of losing them with the future.
+    exc = fut.exception()
+    if exc is not None:
+        print(f"Screenshot dump failed: {exc}", file=sys.stderr)
+
+
+def _take_capture(dump_cfg: Dict[str, Any]) -> Tuple[bytes, str, int, int]:
+    global _prefetched_capture
+    fut, _prefetched_capture = _prefetched_capture, None
+    if fut is not None:
+        return fut.result()
+    return _capture_settled(dump_cfg)
+
+
+def forget_last_screen() -> None:
     """
-    Executes a tool call and returns:
-      - tool_message (role=tool)
-      - optional user_message (role=user) with image for observe_screen
+    Drop the dedup fingerprint so the next observation resends the image. Needed
+    whenever the last screenshot sent is no longer in the model's context.
     """
-    global _screen_dimensions
+    _last_screen["hash"] = b""
+    _last_screen["file"] = None
+
+
+def reset_state() -> None:
+    """
+    Forget per-run screen state (last frame sent, pending prefetch, settle window,
+    dump directories already created). Called at the start of each agent run: a
+    new conversation has no previous screenshot, so its first observation must
+    always carry the image.
+    """
+    global _prefetched_capture, _settle_until
+    forget_last_screen()
+    _dump_dirs_made.clear()
+    _prefetched_capture = None
+    _settle_until = 0.0
+
+
+def _tool_reply(call_id: str, name: str, content: str) -> Dict[str, Any]:
+    return {"role": "tool", "tool_call_id": call_id, "name": name, "content": content}
+
+
+_ToolResult = Tuple[Dict[str, Any], Optional[Dict[str, Any]]]
+
+
+def _norm(value: Any, lower: bool = False, strip: bool = True) -> str:
+    """Single-pass string normalization for tool args (str() only for non-str values)."""
+    if not isinstance(value, str):
+        value = "" if value is None else str(value)
+    if strip:
+        value = value.strip()
+    return value.lower() if lower else value
 
-    if tool_name == "observe_screen":
-        png_bytes, screen_w, screen_h = winapi.capture_screenshot_png(
-            dump_cfg["target_w"], dump_cfg["target_h"]
-        )
-        _screen_dimensions["width"] = screen_w
-        _screen_dimensions["height"] = screen_h
 
-        os.makedirs(dump_cfg["dump_dir"], exist_ok=True)
+def _capture_observation(dump_cfg: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Capture the screen and return (info, user_msg). info holds file/screen size
+    (plus unchanged=True when identical to the last frame sent, in which case
+    user_msg is None); user_msg carries the image for the model.
+    """
+    img_bytes, img_format, screen_w, screen_h = _take_capture(dump_cfg)
+    _screen_dimensions["width"] = screen_w
+    _screen_dimensions["height"] = screen_h
+    data_url_prefix, ext = _IMAGE_FORMATS[img_format]
+
+    screen_hash = hashlib.blake2b(img_bytes, digest_size=16).digest()
+    if screen_hash == _last_screen["hash"]:
+        info = {"file": _last_screen["file"], "unchanged": True, "screen_width": screen_w, "screen_height": screen_h}
+        return info, None
+
+    fn = None
+    if dump_cfg.get("dump_enabled", True):
         fn = os.path.join(
             dump_cfg["dump_dir"],
-            f"{dump_cfg['dump_prefix']}{dump_cfg['dump_idx']:04d}.png",
+            f"{dump_cfg['dump_prefix']}{dump_cfg['dump_idx']:04d}{ext}",
         )
-        with open(fn, "wb") as f:
-            f.write(png_bytes)
+        _DUMP_POOL.submit(_write_dump, fn, img_bytes).add_done_callback(_report_dump_error)
         dump_cfg["dump_idx"] += 1
+    _last_screen["hash"] = screen_hash
+    _last_screen["file"] = fn
 
-        b64 = base64.b64encode(png_bytes).decode("ascii")
-
-        tool_msg = {
-            "role": "tool",
-            "tool_call_id": call_id,
-            "name": tool_name,
-            "content": utils.ok_payload(
-                {
-                    "file": fn,
-                    "screen_width": screen_w,
-                    "screen_height": screen_h,
-                    "message": (
-                        "Screenshot captured. Use normalized coordinates (0-1000). "
-                        "Prefer point clicks: box=[x,y]."
-                    ),
-                }
-            ),
-        }
-
-        user_msg = {
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": (
-                        "Current screen state. Identify UI elements and provide click targets in normalized "
-                        "0-1000 coordinates. Prefer point clicks box=[x,y] for small targets (taskbar icons)."
-                    ),
-                },
-                {"type": "image_url", "image_url": {"url": "data:image/png;base64," + b64}},
-            ],
-        }
-        return tool_msg, user_msg
-
-    if tool_name == "click_element":
-        args, err = utils.parse_args(arg_str)
-        if err:
-            return {"role": "tool", "tool_call_id": call_id, "name": tool_name, "content": err}, None
-
-        label = str(args.get("label", "")).strip()
-        box = args.get("box")
-
-        if not label:
-            return {
-                "role": "tool",
-                "tool_call_id": call_id,
-                "name": tool_name,
-                "content": utils.err_payload("missing_label", "label required"),
-            }, None
-        if box is None:
-            return {
-                "role": "tool",
-                "tool_call_id": call_id,
-                "name": tool_name,
-                "content": utils.err_payload("missing_box", "box required"),
-            }, None
+    # Build the data URL in one bytes buffer and decode once (single large str).
+    data_url = (data_url_prefix + base64.b64encode(img_bytes)).decode("ascii")
+
+    user_msg = {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": _USER_TEXT},
+            {"type": "image_url", "image_url": {"url": data_url}},
+        ],
+    }
+    return {"file": fn, "screen_width": screen_w, "screen_height": screen_h}, user_msg
 
+
+def _finish_action(call_id: str, tool_name: str, extra: Dict[str, Any], dump_cfg: Dict[str, Any]) -> _ToolResult:
+    """
+    Common tail of a successful action: open the settle window, then (auto_observe)
+    attach the post-action screenshot so the model needs no separate observe step.
+    """
+    global _settle_until
+    _settle_until = time.perf_counter() + dump_cfg.get("settle_delay", 0.0)
+
+    if not dump_cfg.get("auto_observe", False):
+        extra["message"] += _VERIFY_HINT
+        return _tool_reply(call_id, tool_name, utils.ok_payload(extra)), None
+
+    info, user_msg = _capture_observation(dump_cfg)
+    extra["message"] += _ATTACHED_HINT if user_msg is not None else _UNCHANGED_HINT
+    extra["screen"] = info
+    return _tool_reply(call_id, tool_name, utils.ok_payload(extra)), user_msg
+
+
+def _do_observe(arg_str: Any, call_id: str, dump_cfg: Dict[str, Any]) -> _ToolResult:
+    info, user_msg = _capture_observation(dump_cfg)
+    info["message"] = _OBSERVE_MSG if user_msg is not None else _UNCHANGED_MSG
+    return _tool_reply(call_id, "observe_screen", utils.ok_payload(info)), user_msg
+
+
+def _do_click(arg_str: Any, call_id: str, dump_cfg: Dict[str, Any]) -> _ToolResult:
+    tool_name = "click_element"
+    args, err = utils.parse_args(arg_str)
+    if err:
+        return _tool_reply(call_id, tool_name, err), None
+
+    label = _norm(args.get("label"))
+    box = args.get("box")
+
+    if not label:
+        return _tool_reply(call_id, tool_name, _ERR_MISSING_LABEL), None
+    if box is None:
+        return _tool_reply(call_id, tool_name, _ERR_MISSING_BOX), None
+
+    bbox, box_err = utils.parse_box(box)
+    if box_err:
+        return _tool_reply(call_id, tool_name, box_err), None
+
+    x1, y1, x2, y2 = bbox
+    cx, cy = utils.box_center(x1, y1, x2, y2)
+
+    px, py = winapi.norm_to_screen_px(cx, cy, _screen_dimensions["width"], _screen_dimensions["height"])
+    winapi.move_mouse_to_pixel(px, py)
+    # Fixed hover dwell: hover-sensitive targets (taskbar icons) give no signal to poll.
+    time.sleep(0.08)
+    before = winapi.input_snapshot()
+    winapi.click_mouse()
+    winapi.wait_input_change(before, 0.12)
+
+    return _finish_action(
+        call_id,
+        tool_name,
+        {
+            "clicked": label,
+            "box_normalized": [[x1, y1], [x2, y2]],
+            "click_position": [cx, cy],
+            "message": f"Clicked '{label}' at ({cx:.1f},{cy:.1f}).",
+        },
+        dump_cfg,
+    )
+
+
+def _do_type(arg_str: Any, call_id: str, dump_cfg: Dict[str, Any]) -> _ToolResult:
+    tool_name = "type_text"
+    args, err = utils.parse_args(arg_str)
+    if err:
+        return _tool_reply(call_id, tool_name, err), None
+
+    text = _norm(args.get("text"), strip=False)
+    # Common case is already ASCII: skip the encode/decode round-trip.
+    text_ascii = text if text.isascii() else text.encode("ascii", "ignore").decode("ascii")
+    if not text_ascii:
+        return _tool_reply(call_id, tool_name, _ERR_EMPTY_TEXT), None
+
+    before = winapi.input_snapshot()
+    winapi.type_text(text_ascii)
+    winapi.wait_input_change(before, 0.08)
+
+    return _finish_action(
+        call_id,
+        tool_name,
+        {"typed": text_ascii, "chars": len(text_ascii), "message": "Typed text."},
+        dump_cfg,
+    )
+
+
+def _do_press(arg_str: Any, call_id: str, dump_cfg: Dict[str, Any]) -> _ToolResult:
+    tool_name = "press_key"
+    args, err = utils.parse_args(arg_str)
+    if err:
+        return _tool_reply(call_id, tool_name, err), None
+
+    key = _norm(args.get("key"), lower=True)
+    if not key:
+        return _tool_reply(call_id, tool_name, _ERR_MISSING_KEY), None
+
+    before = winapi.input_snapshot()
+    try:
+        winapi.press_key(key)
+    except ValueError as e:
+        return _tool_reply(call_id, tool_name, utils.err_payload("invalid_key", str(e))), None
+    winapi.wait_input_change(before, 0.08)
+
+    return _finish_action(call_id, tool_name, {"key": key, "message": f"Pressed '{key}'."}, dump_cfg)
+
+
+def _do_scroll(arg_str: Any, call_id: str, dump_cfg: Dict[str, Any]) -> _ToolResult:
+    tool_name = "scroll_at_position"
+    args, err = utils.parse_args(arg_str)
+    if err:
+        return _tool_reply(call_id, tool_name, err), None
+
+    box = args.get("box")
+    if box is not None:
         bbox, box_err = utils.parse_box(box)
         if box_err:
-            return {"role": "tool", "tool_call_id": call_id, "name": tool_name, "content": box_err}, None
-
-        x1, y1, x2, y2 = bbox
-        cx, cy = utils.box_center(x1, y1, x2, y2)
-
-        px, py = winapi.norm_to_screen_px(cx, cy, _screen_dimensions["width"], _screen_dimensions["height"])
-        winapi.move_mouse_to_pixel(px, py)
-        time.sleep(0.08)
-        winapi.click_mouse()
-        time.sleep(0.12)
-
-        return {
-            "role": "tool",
-            "tool_call_id": call_id,
-            "name": tool_name,
-            "content": utils.ok_payload(
-                {
-                    "clicked": label,
-                    "box_normalized": [[x1, y1], [x2, y2]],
-                    "click_position": [cx, cy],
-                    "message": f"Clicked '{label}' at ({cx:.1f},{cy:.1f}). Use observe_screen to verify.",
-                }
-            ),
-        }, None
-
-    if tool_name == "type_text":
-        args, err = utils.parse_args(arg_str)
-        if err:
-            return {"role": "tool", "tool_call_id": call_id, "name": tool_name, "content": err}, None
-
-        text = str(args.get("text", ""))
-        text_ascii = text.encode("ascii", "ignore").decode("ascii")
-        if not text_ascii:
-            return {
-                "role": "tool",
-                "tool_call_id": call_id,
-                "name": tool_name,
-                "content": utils.err_payload("empty_text", "text empty or no ASCII chars"),
-            }, None
-
-        winapi.type_text(text_ascii)
-        time.sleep(0.08)
-
-        return {
-            "role": "tool",
-            "tool_call_id": call_id,
-            "name": tool_name,
-            "content": utils.ok_payload(
-                {"typed": text_ascii, "chars": len(text_ascii), "message": "Typed text. Use observe_screen to verify."}
-            ),
-        }, None
-
-    if tool_name == "press_key":
-        args, err = utils.parse_args(arg_str)
-        if err:
-            return {"role": "tool", "tool_call_id": call_id, "name": tool_name, "content": err}, None
-
-        key = str(args.get("key", "")).strip().lower()
-        if not key:
-            return {
-                "role": "tool",
-                "tool_call_id": call_id,
-                "name": tool_name,
-                "content": utils.err_payload("missing_key", "key required"),
-            }, None
-
-        try:
-            winapi.press_key(key)
-            time.sleep(0.08)
-            return {
-                "role": "tool",
-                "tool_call_id": call_id,
-                "name": tool_name,
-                "content": utils.ok_payload({"key": key, "message": f"Pressed '{key}'. Use observe_screen to verify."}),
-            }, None
-        except ValueError as e:
-            return {
-                "role": "tool",
-                "tool_call_id": call_id,
-                "name": tool_name,
-                "content": utils.err_payload("invalid_key", str(e)),
-            }, None
-
-    if tool_name == "scroll_at_position":
-        args, err = utils.parse_args(arg_str)
-        if err:
-            return {"role": "tool", "tool_call_id": call_id, "name": tool_name, "content": err}, None
-
-        box = args.get("box")
-        if box is not None:
-            bbox, box_err = utils.parse_box(box)
-            if box_err:
-                return {"role": "tool", "tool_call_id": call_id, "name": tool_name, "content": box_err}, None
-            cx, cy = utils.box_center(*bbox)
-        else:
-            cx, cy = 500.0, 500.0
-
-        px, py = winapi.norm_to_screen_px(cx, cy, _screen_dimensions["width"], _screen_dimensions["height"])
-        winapi.move_mouse_to_pixel(px, py)
-        time.sleep(0.06)
-        winapi.scroll_down()
-        time.sleep(0.08)
-
-        return {
-            "role": "tool",
-            "tool_call_id": call_id,
-            "name": tool_name,
-            "content": utils.ok_payload({"message": f"Scrolled down at ({cx:.1f},{cy:.1f}). Use observe_screen to verify."}),
-        }, None
-
-    return {
-        "role": "tool",
-        "tool_call_id": call_id,
-        "name": tool_name,
-        "content": utils.err_payload("unknown_tool", f"Unknown tool: {tool_name}"),
-    }, None
+            return _tool_reply(call_id, tool_name, box_err), None
+        cx, cy = utils.box_center(*bbox)
+    else:
+        cx, cy = 500.0, 500.0
+
+    px, py = winapi.norm_to_screen_px(cx, cy, _screen_dimensions["width"], _screen_dimensions["height"])
+    winapi.move_mouse_to_pixel(px, py)
+    time.sleep(0.06)  # dwell so the target under the cursor receives the wheel
+    winapi.scroll_down()
+    time.sleep(0.08)
+
+    return _finish_action(call_id, tool_name, {"message": f"Scrolled down at ({cx:.1f},{cy:.1f})."}, dump_cfg)
+
+
+_HANDLERS: Dict[str, Callable[[Any, str, Dict[str, Any]], _ToolResult]] = {
+    "observe_screen": _do_observe,
+    "click_element": _do_click,
+    "type_text": _do_type,
+    "press_key": _do_press,
+    "scroll_at_position": _do_scroll,
+}
+
+
+def execute_tool(
+    tool_name: str,
+    arg_str: Any,
+    call_id: str,
+    dump_cfg: Dict[str, Any],
+) -> _ToolResult:
+    """
+    Executes a tool call and returns:
+      - tool_message (role=tool)
+      - optional user_message (role=user) with image for observe_screen
+        (and for successful actions when dump_cfg["auto_observe"] is set)
+    """
+    global _prefetched_capture
+
+    handler = _HANDLERS.get(tool_name)
+    if handler is None:
+        return _tool_reply(call_id, tool_name, utils.err_payload("unknown_tool", f"Unknown tool: {tool_name}")), None
+
+    if handler is not _do_observe:
+        # A prefetched frame is stale once any other tool runs.
+        _prefetched_capture = None
+    return handler(arg_str, call_id, dump_cfg)
 
 
 SYSTEM_PROMPT = """You are an autonomous AI agent with vision and control over a Windows desktop. Complete user tasks through observation and interaction with the GUI.
@@ -383,9 +527,32 @@ SYSTEM_PROMPT = """You are an autonomous AI agent with vision and control over a
 - One action per step.
 Begin by observing the screen."""
 
+_OBSERVE_STEP = "1. OBSERVE: observe_screen()"
+_OBSERVE_STEP_ATTACHED = (
+    "1. OBSERVE: use the screenshot attached to the last action result; "
+    "call observe_screen() only when there is none (e.g. at the start)."
+)
+_VERIFY_STEP = "4. VERIFY: observe_screen() after actions."
+_VERIFY_STEP_ATTACHED = (
+    "4. VERIFY: each successful action result comes with the resulting screenshot attached; "
+    "check it instead of calling observe_screen() (use observe_screen() only to wait for slow changes)."
+)
+
+
+def system_prompt(auto_observe: bool) -> str:
+    """SYSTEM_PROMPT with the OBSERVE/VERIFY steps matching dump_cfg["auto_observe"]."""
+    if not auto_observe:
+        return SYSTEM_PROMPT
+    return SYSTEM_PROMPT.replace(_OBSERVE_STEP, _OBSERVE_STEP_ATTACHED).replace(_VERIFY_STEP, _VERIFY_STEP_ATTACHED)
+
 
 SCENARIOS = [
     {"name": "Open YouTube", "task_prompt": "Use the GRROK ai that is open in chrome browser windows to initialize a conversation about wgabrys88 github projects and make sure to not stop the conversation, depending on the grok response you may want to open a link that grok provides to wgabrys88 github project, then analyze the repo and back to grok again to further explanations on the things you saw, this is a never-ending task, there is always more to learn from grok, begin the investigation."},
     {"name": "Open start menu on Windows", "task_prompt": "Click on the Start Menu icon on Windows - it is the one on the left, on the taskbar. Before clicking move mouse to the place whre you will want to click, observe if the mouse is in proper place, only then click and then take a screenshot to verify that tha start menu is opened in reality, do not assume any action happened, always make sure because you are controlling a mouse and keuboard but it doesnt mean that these devices are working properly without your own visual verification you cannot trust that tool really did what you wanted it to do."},
     {"name": "Open start menu on Windows", "task_prompt": "Click on the Start Menu icon on Windows - it is the one on the left, on the taskbar. Before clicking move mouse to the place whre you will want to click, observe if the mouse is in proper place, only then click and then take a screenshot to verify that tha start menu is opened in reality, do not assume any action happened, always make sure because you are controlling a mouse and keuboard but it doesnt mean that these devices are working properly without your own visual verification you cannot trust that tool really did what you wanted it to do. After that open notepad++ verify if its opened and write to it using keyboard a history of your actions that you remember, also write any plans for the future and then task will be completed. Make sure during writing phase that you are using notepad++ and not using keyboard on some other window which may cause a system failure."},
 ]
+
+
+# Freeze the module-level tables: shared read-only for the whole run.
+TOOLS_SCHEMA = tuple(MappingProxyType(t) for t in TOOLS_SCHEMA)
+SCENARIOS = tuple(MappingProxyType(sc) for sc in SCENARIOS)
@@ -2,13 +2,39 @@
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import base64
+import functools
+import gzip
 import hashlib
+import http.client
+import io
 import json
 import logging
+import logging.handlers
+import os
+import queue
 import re
+import threading
+import urllib.error
+import urllib.parse
 import urllib.request
+from array import array
+from collections import deque
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import orjson  # optional accelerator; stdlib json is the fallback
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson  # optional parse-only accelerator, used when orjson is absent
+except ImportError:
+    simdjson = None
 
 
 # -----------------------------
@@ -16,18 +42,112 @@ from typing import Any, Dict, List, Optional, Tuple
 # -----------------------------
 
 _http_logger = None
+_http_log_listener: Optional[logging.handlers.QueueListener] = None
+
+_LOG_FILE_BUFFER = 1 << 20
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Enqueue the record unformatted: message building (pretty-printing the
+        # exchange) then happens on the listener thread. Callers only log snapshots.
+        return record
 
-def init_http_logger(log_file: Path) -> None:
-    global _http_logger
+
+def init_http_logger(log_file: Path, level: str = "INFO") -> None:
+    """
+    Log records are queued by the caller and written to log_file by a background
+    listener thread, so post_json never blocks on disk I/O. The listener is
+    stopped (queue drained, file flushed) at exit. A level above INFO (e.g.
+    "WARNING") turns the request/response dumps off entirely.
+    """
+    global _http_logger, _http_log_listener
+    stop_http_logger()
     _http_logger = logging.getLogger('http_exchange')
-    _http_logger.setLevel(logging.INFO)
+    log_level = logging.getLevelName(level.upper())
+    _http_logger.setLevel(log_level if isinstance(log_level, int) else logging.INFO)
     _http_logger.handlers.clear()
-    handler = logging.FileHandler(log_file, mode='w', encoding='utf-8')
-    handler.setFormatter(logging.Formatter('%(message)s'))
-    _http_logger.addHandler(handler)
+    file_handler = logging.FileHandler(log_file, mode='w', encoding='utf-8', delay=True)
+    file_handler.stream = open(log_file, 'w', encoding='utf-8', buffering=_LOG_FILE_BUFFER)
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+    log_queue: queue.Queue = queue.Queue(-1)
+    _http_log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+    _http_log_listener.start()
+    _http_logger.addHandler(_DeferredQueueHandler(log_queue))
     _http_logger.propagate = False
 
 
+def stop_http_logger() -> None:
+    """Drain queued log records and close the log file (idempotent)."""
+    global _http_log_listener
+    if _http_log_listener is None:
+        return
+    listener, _http_log_listener = _http_log_listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(stop_http_logger)
+
+
+# -----------------------------
+# JSON codec (orjson / simdjson when installed)
+# -----------------------------
+
+def _json_default(obj: Any) -> Any:
+    # Frozen tables (scenarios.TOOLS_SCHEMA / SCENARIOS) are read-only mappings.
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Compact JSON encoding as UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default)
+    return json.dumps(obj, ensure_ascii=True, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    """Compact JSON encoding as str."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=True, separators=(",", ":"), default=_json_default)
+
+
+def dumps_pretty(obj: Any) -> str:
+    """Two-space indented JSON for logs (orjson leaves non-ASCII text unescaped)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2, ensure_ascii=True, default=_json_default)
+
+
+def loads(data: Any) -> Any:
+    """Decode JSON from bytes or str. Invalid input raises ValueError."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if simdjson is not None:
+        return simdjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_with_precoded(obj: Dict[str, Any], precoded: Optional[Dict[str, bytes]] = None) -> bytes:
+    """
+    Encode a top-level object, splicing in members that are already JSON bytes
+    (e.g. a constant tools schema encoded once per run) instead of re-encoding them.
+    Keys present in both obj and precoded take the precoded value.
+    """
+    if not precoded:
+        return dumps_bytes(obj)
+    dynamic = {k: v for k, v in obj.items() if k not in precoded}
+    members = [dumps_bytes(k) + b":" + v for k, v in precoded.items()]
+    head = dumps_bytes(dynamic)[:-1]  # drop the closing brace
+    if len(head) > 1:
+        head += b","
+    return head + b",".join(members) + b"}"
+
+
 # -----------------------------
 # Common JSON payload helpers
 # -----------------------------
@@ -36,15 +156,11 @@ def ok_payload(extra: Optional[Dict[str, Any]] = None) -> str:
     d: Dict[str, Any] = {"ok": True}
     if extra:
         d.update(extra)
-    return json.dumps(d, ensure_ascii=True, separators=(",", ":"))
+    return dumps_str(d)
 
 
 def err_payload(error_type: str, message: str) -> str:
-    return json.dumps(
-        {"ok": False, "error": {"type": error_type, "message": message}},
-        ensure_ascii=True,
-        separators=(",", ":"),
-    )
+    return dumps_str({"ok": False, "error": {"type": error_type, "message": message}})
 
 
 def parse_args(arg_str: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
@@ -62,9 +178,17 @@ def parse_args(arg_str: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
     if not isinstance(arg_str, str):
         return None, err_payload("invalid_args", "arguments must be a dict or JSON string")
 
+    args, err = _parse_args_json(arg_str)
+    # Shallow copy so callers never mutate the cached dict.
+    return (dict(args) if args is not None else None), err
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_args_json(arg_str: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Memoized JSON parse: models often repeat identical calls (same box, same key)."""
     try:
-        val = json.loads(arg_str) if arg_str else {}
-    except json.JSONDecodeError as e:
+        val = loads(arg_str) if arg_str else {}
+    except ValueError as e:
         return None, err_payload("invalid_json", f"arguments must be valid JSON: {e}")
 
     if not isinstance(val, dict):
@@ -77,6 +201,25 @@ def parse_args(arg_str: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
 # Box parsing (robust)
 # -----------------------------
 
+_BOX_FORMAT_ERR = err_payload(
+    "invalid_box",
+    "box must be [x,y], [x1,y1,x2,y2], or [[x1,y1],[x2,y2]]",
+)
+
+
+_NUMBER_TYPES = (int, float)
+
+
+def _clamp_norm(v: float) -> float:
+    return max(0.0, min(1000.0, v))
+
+
+def _ordered_box(x1: float, y1: float, x2: float, y2: float) -> Tuple[float, float, float, float]:
+    """Clamp corners to [0,1000] and order them so (x1,y1) is top-left."""
+    x1, y1, x2, y2 = _clamp_norm(x1), _clamp_norm(y1), _clamp_norm(x2), _clamp_norm(y2)
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+
 def parse_box(box: Any) -> Tuple[Optional[Tuple[float, float, float, float]], Optional[str]]:
     """
     Parse click/region targets in normalized 0-1000 coordinates.
@@ -88,62 +231,30 @@ def parse_box(box: Any) -> Tuple[Optional[Tuple[float, float, float, float]], Op
 
     Returns: (x1, y1, x2, y2) clamped to [0,1000], or (None, err_json).
     """
-
-    def clamp(v: float) -> float:
-        return max(0.0, min(1000.0, v))
-
+    if type(box) is not list:
+        return None, _BOX_FORMAT_ERR
+    n = len(box)
     try:
-        # Point: [x, y]
-        if (
-            isinstance(box, list)
-            and len(box) == 2
-            and all(isinstance(v, (int, float)) for v in box)
-        ):
-            x, y = clamp(float(box[0])), clamp(float(box[1]))
-            return (x, y, x, y), None  # zero-area bbox; center == point
-
-        # Flat bbox: [x1, y1, x2, y2]
-        if (
-            isinstance(box, list)
-            and len(box) == 4
-            and all(isinstance(v, (int, float)) for v in box)
-        ):
-            x1, y1, x2, y2 = map(float, box)
-            x1, y1, x2, y2 = clamp(x1), clamp(y1), clamp(x2), clamp(y2)
-            if x1 > x2:
-                x1, x2 = x2, x1
-            if y1 > y2:
-                y1, y2 = y2, y1
-            return (x1, y1, x2, y2), None
-
-        # Legacy bbox: [[x1,y1],[x2,y2]]
-        if not isinstance(box, list) or len(box) != 2:
-            return None, err_payload(
-                "invalid_box",
-                "box must be [x,y], [x1,y1,x2,y2], or [[x1,y1],[x2,y2]]",
-            )
-
-        p1, p2 = box
-        if (
-            not (isinstance(p1, list) and isinstance(p2, list))
-            or len(p1) != 2
-            or len(p2) != 2
-        ):
-            return None, err_payload(
-                "invalid_box",
-                "box must be [x,y], [x1,y1,x2,y2], or [[x1,y1],[x2,y2]]",
-            )
-
-        x1, y1 = float(p1[0]), float(p1[1])
-        x2, y2 = float(p2[0]), float(p2[1])
-
-        x1, y1, x2, y2 = clamp(x1), clamp(y1), clamp(x2), clamp(y2)
-        if x1 > x2:
-            x1, x2 = x2, x1
-        if y1 > y2:
-            y1, y2 = y2, y1
-
-        return (x1, y1, x2, y2), None
+        if n == 2:
+            a, b = box
+            # Point: [x, y]
+            if isinstance(a, _NUMBER_TYPES) and isinstance(b, _NUMBER_TYPES):
+                x, y = _clamp_norm(float(a)), _clamp_norm(float(b))
+                return (x, y, x, y), None  # zero-area bbox; center == point
+
+            # Legacy bbox: [[x1,y1],[x2,y2]]
+            if type(a) is not list or type(b) is not list or len(a) != 2 or len(b) != 2:
+                return None, _BOX_FORMAT_ERR
+            return _ordered_box(float(a[0]), float(a[1]), float(b[0]), float(b[1])), None
+
+        # Flat bbox: [x1, y1, x2, y2]; same element rule as the point form.
+        if n == 4:
+            x1, y1, x2, y2 = box
+            if not all(isinstance(v, _NUMBER_TYPES) for v in box):
+                return None, _BOX_FORMAT_ERR
+            return _ordered_box(float(x1), float(y1), float(x2), float(y2)), None
+
+        return None, _BOX_FORMAT_ERR
 
     except (TypeError, ValueError) as e:
         return None, err_payload("invalid_box", f"coordinates must be numbers: {e}")
@@ -163,45 +274,146 @@ _THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
 def strip_think(text: str) -> str:
     if not isinstance(text, str) or not text:
         return ""
+    if "<think>" not in text:
+        # Common case: no think block, skip the regex scan.
+        return text.strip()
     return _THINK_RE.sub("", text).strip()
 
 
-def prune_old_screenshots(messages: List[Dict[str, Any]], keep_last: int) -> List[Dict[str, Any]]:
-    idxs = []
-    for i, m in enumerate(messages):
-        if m.get("role") != "user":
-            continue
-        c = m.get("content")
-        if not isinstance(c, list):
-            continue
-        if any(isinstance(p, dict) and p.get("type") == "image_url" for p in c):
-            idxs.append(i)
+_OMITTED_IMAGE = "captured image data (omitted)"
 
-    if len(idxs) <= keep_last:
-        return messages
 
-    for i in idxs[:-keep_last]:
-        messages[i]["content"] = "captured image data (omitted)"
+def _is_screenshot_msg(m: Dict[str, Any]) -> bool:
+    if m.get("role") != "user":
+        return False
+    c = m.get("content")
+    return isinstance(c, list) and any(isinstance(p, dict) and p.get("type") == "image_url" for p in c)
+
+
+def _has_think_block(m: Dict[str, Any]) -> bool:
+    if m.get("role") != "assistant":
+        return False
+    c = m.get("content")
+    # One scan for a complete <think>...</think> block (the same test the later sub needs).
+    return isinstance(c, str) and _THINK_RE.search(c) is not None
+
+
+MSG_TEXT, MSG_SCREENSHOT, MSG_THINK = 0, 1, 2
+
+
+def _message_kind(m: Dict[str, Any]) -> int:
+    if _is_screenshot_msg(m):
+        return MSG_SCREENSHOT
+    if _has_think_block(m):
+        return MSG_THINK
+    return MSG_TEXT
+
+
+def prune_history(messages: List[Dict[str, Any]], keep_images: int, keep_thinks: int) -> List[Dict[str, Any]]:
+    """
+    One pass over messages for both prunes: screenshots beyond the last
+    keep_images become a placeholder, think blocks beyond the last keep_thinks
+    are stripped. keep_* <= 0 disables that prune. Mutates in place.
+    """
+    if all(k <= 0 or len(messages) <= k for k in (keep_images, keep_thinks)):
+        return messages
+    img_idxs: List[int] = []
+    think_idxs: List[int] = []
+    for i, m in enumerate(messages):
+        kind = _message_kind(m)
+        if kind == MSG_SCREENSHOT:
+            img_idxs.append(i)
+        elif kind == MSG_THINK:
+            think_idxs.append(i)
+
+    if keep_images > 0:
+        for i in img_idxs[:-keep_images]:
+            messages[i]["content"] = _OMITTED_IMAGE
+    if keep_thinks > 0:
+        for i in think_idxs[:-keep_thinks]:
+            messages[i]["content"] = _THINK_RE.sub("", messages[i]["content"]).strip()
     return messages
 
 
+def prune_old_screenshots(messages: List[Dict[str, Any]], keep_last: int) -> List[Dict[str, Any]]:
+    return prune_history(messages, keep_last, 0)
+
+
 def prune_old_thinks(messages: List[Dict[str, Any]], keep_last: int) -> List[Dict[str, Any]]:
-    idxs = []
-    for i, m in enumerate(messages):
-        if m.get("role") != "assistant":
-            continue
-        c = m.get("content")
-        if isinstance(c, str) and "<think>" in c and "</think>" in c:
-            idxs.append(i)
+    return prune_history(messages, 0, keep_last)
 
-    if len(idxs) <= keep_last:
-        return messages
 
-    for i in idxs[:-keep_last]:
-        c = messages[i].get("content")
-        if isinstance(c, str):
-            messages[i]["content"] = _THINK_RE.sub("", c).strip()
-    return messages
+class MessageStore:
+    """
+    Agent conversation: a fixed prefix (system + task prompt) followed by at
+    most max_turns turns. A turn is an assistant message plus its tool/user
+    replies and is evicted whole, so a tool call never loses its result.
+
+    Each turn keeps a parallel array of message kinds (text / screenshot /
+    think-tagged), classified once on add(). prune() scans those small ints
+    instead of walking message dicts, newest first, and stops once the surplus
+    is redacted; redacted messages become MSG_TEXT. Redaction writes into the
+    message dicts in place, like prune_old_screenshots/prune_old_thinks.
+    """
+
+    def __init__(self, prefix: Sequence[Dict[str, Any]], max_turns: int) -> None:
+        self._prefix = tuple(prefix)
+        self._max_turns = max(1, max_turns)
+        self._turns: Deque[Tuple[List[Dict[str, Any]], array]] = deque()
+        self._live = [0, 0, 0]  # messages per kind still in the window
+
+    def new_turn(self, *msgs: Dict[str, Any]) -> None:
+        if len(self._turns) >= self._max_turns:
+            _, kinds = self._turns.popleft()
+            for k in kinds:
+                self._live[k] -= 1
+        self._turns.append(([], array("B")))
+        for m in msgs:
+            self.add(m)
+
+    @property
+    def screenshot_count(self) -> int:
+        """Unredacted screenshots still in the window (eviction can drop the last one)."""
+        return self._live[MSG_SCREENSHOT]
+
+    def add(self, m: Dict[str, Any]) -> None:
+        """Append to the current turn."""
+        msgs, kinds = self._turns[-1]
+        k = _message_kind(m)
+        msgs.append(m)
+        kinds.append(k)
+        self._live[k] += 1
+
+    def messages(self) -> List[Dict[str, Any]]:
+        out = list(self._prefix)
+        for msgs, _ in self._turns:
+            out.extend(msgs)
+        return out
+
+    def prune(self, keep_last_screenshots: int, keep_last_thinks: int) -> None:
+        """keep_last <= 0 disables pruning for that kind, as in prune_old_*."""
+        keep = (0, keep_last_screenshots, keep_last_thinks)
+        excess = [0] + [self._live[k] - keep[k] if keep[k] > 0 else 0 for k in (MSG_SCREENSHOT, MSG_THINK)]
+        seen = [0, 0, 0]
+        for msgs, kinds in reversed(self._turns):
+            if excess[MSG_SCREENSHOT] <= 0 and excess[MSG_THINK] <= 0:
+                return
+            for i in range(len(kinds) - 1, -1, -1):
+                k = kinds[i]
+                if excess[k] <= 0:
+                    continue
+                seen[k] += 1
+                if seen[k] <= keep[k]:
+                    continue
+                m = msgs[i]
+                if k == MSG_SCREENSHOT:
+                    m["content"] = _OMITTED_IMAGE
+                else:
+                    m["content"] = _THINK_RE.sub("", m["content"]).strip()
+                kinds[i] = MSG_TEXT
+                self._live[k] -= 1
+                self._live[MSG_TEXT] += 1
+                excess[k] -= 1
 
 
 # -----------------------------
@@ -218,100 +430,411 @@ def summarize_data_image_url(url: str) -> str:
     payload = url[comma + 1:]
     if len(payload) < 100:
         return url
-    sha = hashlib.sha256(payload.encode("utf-8", errors="ignore")).hexdigest()[:12]
-    return f"{header}[b64 sha={sha} len={len(payload)}]"
+    # Log fingerprint only: BLAKE2b is much faster than SHA-256, and base64 is ASCII.
+    digest = hashlib.blake2b(payload.encode("ascii", errors="ignore"), digest_size=6).hexdigest()
+    return f"{header}[b64 blake2b={digest} len={len(payload)}]"
 
 
-def truncate_base64_images(obj: Any) -> Any:
+def redact_base64_images(obj: Any) -> Any:
+    """
+    Copy of a nested JSON structure with every "url" data URL summarized,
+    leaving obj untouched. Containers are rebuilt but strings are shared, so no
+    megabyte-scale copy is made. See shallow_redact for the cheaper chat-request copy.
+    """
     if isinstance(obj, dict):
-        for k, v in list(obj.items()):
-            if k == "url" and isinstance(v, str):
-                obj[k] = summarize_data_image_url(v)
-            else:
-                truncate_base64_images(v)
-    elif isinstance(obj, list):
-        for it in obj:
-            truncate_base64_images(it)
+        return {
+            k: summarize_data_image_url(v) if k == "url" and isinstance(v, str) else redact_base64_images(v)
+            for k, v in obj.items()
+        }
+    if isinstance(obj, list):
+        return [redact_base64_images(it) for it in obj]
     return obj
 
 
+_BRACKET_LINES = frozenset(("", ",", "{", "}", "[", "]", "{,", "},", "[,", "],"))
+
+
+# -----------------------------
+# Keep-alive HTTP connections
+# -----------------------------
+
+# Idle keep-alive connections per (scheme, netloc). A request checks one out,
+# so concurrent callers (e.g. post_json from worker threads) never share a socket.
+_HTTP_POOL_MAXSIZE = 4
+_http_pool: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+_http_pool_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _proxy_route(scheme: str, netloc: str) -> Optional[Tuple[str, Tuple[Tuple[str, str], ...]]]:
+    """
+    (proxy netloc, proxy headers) for requests to scheme://netloc, or None to
+    connect directly. Follows urlopen: HTTP(S)_PROXY / NO_PROXY from the
+    environment (or the Windows registry settings) via urllib.request.
+    Resolved once per target; the environment does not change during a run.
+    """
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(netloc):
+        return None
+    parts = urllib.parse.urlsplit(proxy if "://" in proxy else "http://" + proxy)
+    headers: Tuple[Tuple[str, str], ...] = ()
+    if parts.username is not None:
+        cred = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+        headers = (("Proxy-Authorization", "Basic " + base64.b64encode(cred.encode()).decode("ascii")),)
+    return parts.netloc.rpartition("@")[2], headers
+
+
+def _checkout_conn(scheme: str, netloc: str, timeout: int, fresh: bool = False) -> http.client.HTTPConnection:
+    """Take an idle pooled connection for (scheme, netloc), or open a new one (always when fresh)."""
+    conn = None
+    if not fresh:
+        with _http_pool_lock:
+            idle = _http_pool.get((scheme, netloc))
+            if idle:
+                conn = idle.pop()
+    if conn is None:
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        route = _proxy_route(scheme, netloc)
+        if route is None:
+            return cls(netloc, timeout=timeout)
+        # HTTPS goes through a CONNECT tunnel; plain HTTP sends absolute URLs to the proxy.
+        conn = cls(route[0], timeout=timeout)
+        if scheme == "https":
+            conn.set_tunnel(netloc, headers=dict(route[1]))
+        return conn
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn
+
+
+def _checkin_conn(scheme: str, netloc: str, conn: http.client.HTTPConnection) -> None:
+    """Return a connection whose response was fully read; close it if the pool is full."""
+    with _http_pool_lock:
+        idle = _http_pool.setdefault((scheme, netloc), [])
+        if len(idle) < _HTTP_POOL_MAXSIZE:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+def close_http_connections() -> None:
+    with _http_pool_lock:
+        conns = [conn for idle in _http_pool.values() for conn in idle]
+        _http_pool.clear()
+    for conn in conns:
+        conn.close()
+
+
+atexit.register(close_http_connections)
+
+
+def _http_post(
+    endpoint: str,
+    body: bytes,
+    headers: Dict[str, str],
+    timeout: int,
+    read_body: Optional[Callable[[http.client.HTTPResponse], Any]] = None,
+) -> Any:
+    """
+    POST over a pooled keep-alive connection and return the raw response body,
+    or whatever read_body(resp) returns when given (used for streaming).
+    A stale pooled connection (closed by the server while idle) is retried once
+    on a fresh socket. HTTP errors raise urllib.error.HTTPError like urlopen,
+    and proxies are chosen the same way (see _proxy_route).
+    Thread-safe: each call holds its connection exclusively until the body is read.
+    """
+    parts = urllib.parse.urlsplit(endpoint)
+    scheme, netloc = parts.scheme or "http", parts.netloc
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    route = _proxy_route(scheme, netloc)
+    if route is not None and scheme != "https":
+        path = f"{scheme}://{netloc}{path}"
+        if route[1]:
+            headers = {**headers, **dict(route[1])}
+
+    retried = False
+    while True:
+        conn = _checkout_conn(scheme, netloc, timeout, fresh=retried)
+        try:
+            conn.request("POST", path, body=body, headers=headers)
+            resp = conn.getresponse()
+        except ConnectionError:
+            # Covers RemoteDisconnected, reset/broken pipe and, on Windows, the
+            # ConnectionAbortedError (WSAECONNABORTED) from writing to a socket closed while idle.
+            conn.close()
+            if retried:
+                raise
+            retried = True
+            continue
+        except Exception:
+            conn.close()
+            raise
+
+        try:
+            if resp.status >= 400:
+                data = resp.read()
+                raise urllib.error.HTTPError(endpoint, resp.status, resp.reason, resp.headers, io.BytesIO(data))
+            result = read_body(resp) if read_body is not None else resp.read()
+        except urllib.error.HTTPError:
+            if resp.will_close:
+                conn.close()
+            else:
+                _checkin_conn(scheme, netloc, conn)
+            raise
+        except Exception:
+            conn.close()
+            raise
+
+        if resp.will_close:
+            conn.close()
+        else:
+            _checkin_conn(scheme, netloc, conn)
+        return result
+
+
+def _read_sse_completion(
+    resp: http.client.HTTPResponse,
+    on_tool_name: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Assemble a streamed (SSE) chat completion into the non-streaming response
+    shape. Stops reading as soon as the choice reports a finish_reason, then
+    drains the trailing frames so the connection can be reused. Servers that
+    ignore "stream" and answer with plain JSON are handled too. An in-stream
+    error frame, or a stream that ends without a finish_reason, raises
+    RuntimeError instead of passing for an empty final answer.
+    on_tool_name(name) fires as soon as a tool call's name arrives, before
+    its arguments are complete.
+    """
+    if "text/event-stream" not in (resp.getheader("Content-Type") or ""):
+        return loads(resp.read())
+
+    content_parts: List[str] = []
+    tool_calls: Dict[int, Dict[str, Any]] = {}
+    finish_reason = None
+
+    for raw in resp:
+        line = raw.strip()
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            break
+        frame = loads(data)
+        if frame.get("error"):
+            raise RuntimeError(f"Streamed completion failed: {frame['error']}")
+        choices = frame.get("choices") or []
+        if not choices:
+            continue
+        choice = choices[0]
+        delta = choice.get("delta") or {}
+
+        if delta.get("content"):
+            content_parts.append(delta["content"])
+
+        for tc in delta.get("tool_calls") or []:
+            slot = tool_calls.setdefault(
+                tc.get("index", len(tool_calls)),
+                {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+            )
+            if tc.get("id"):
+                slot["id"] = tc["id"]
+            fn = tc.get("function") or {}
+            if fn.get("name"):
+                is_new = not slot["function"]["name"]
+                slot["function"]["name"] += fn["name"]
+                if is_new and on_tool_name is not None:
+                    on_tool_name(slot["function"]["name"])
+            if fn.get("arguments"):
+                slot["function"]["arguments"] += fn["arguments"]
+
+        if choice.get("finish_reason"):
+            finish_reason = choice["finish_reason"]
+            break
+
+    if finish_reason is None:
+        raise RuntimeError("Streamed completion ended without a finish_reason")
+    resp.read()
+
+    msg: Dict[str, Any] = {"role": "assistant", "content": "".join(content_parts)}
+    if tool_calls:
+        msg["tool_calls"] = [tool_calls[i] for i in sorted(tool_calls)]
+    return {"choices": [{"index": 0, "message": msg, "finish_reason": finish_reason}]}
+
+
 # -----------------------------
 # HTTP helper with logging
 # -----------------------------
 
-def post_json(payload: Dict[str, Any], endpoint: str, timeout: int) -> Dict[str, Any]:
-    global _http_logger
-    
-    # Log request
-    if _http_logger:
-        _http_logger.info("=" * 80)
-        _http_logger.info("REQUEST TO MODEL:")
-        _http_logger.info("=" * 80)
-        logged_payload = truncate_base64_images(json.loads(json.dumps(payload)))
-
-        logged_payload["tools"] = "[TOOLS DEFINITIONS TRUNCATED FOR LOG READABILITY]"
-        logged_payload["messages"][0]["content"] = "[SYSTEM PROMPT TRUNCATED FOR LOG READABILITY]"
-        logged_payload["messages"][1]["content"] = "[INITIAL USER TASK PROMPT TRUNCATED FOR LOG READABILITY]"
-
-
-        # # Compact & clean JSON dump (pretty base + remove useless brace/empty lines)
-        json_str = json.dumps(logged_payload, indent=2, ensure_ascii=True)
-        # clean_json = '\n'.join(
-        #     line for line in json_str.splitlines()
-        #     if line.rstrip() and not re.match(r'^\s*[\{\}\[\]],?\s*$', line.rstrip())
-        # )
-
-        # Two-pass cleanup (concise one-liner with multiple conditions)
-        clean_json = '\n'.join(
-            line for line in json_str.splitlines()
-            if line.rstrip()  # skip empty/whitespace-only lines
-            and not re.match(r'^\s*[{\}\[\]],?\s*$', line.rstrip())  # skip brace/bracket + optional comma lines
-            and not re.match(r'^\s*,\s*$', line.rstrip())             # skip pure comma lines (if any)
-        )
+_GZIP_MIN_BYTES = 4096
 
 
-        _http_logger.info(clean_json)
-        _http_logger.info("")  # blank line separator
-    
-    data = json.dumps(payload, ensure_ascii=True).encode("utf-8")
-    req = urllib.request.Request(
-        endpoint,
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST",
+def _maybe_gzip(body: bytes, headers: Dict[str, str], compress: bool) -> bytes:
+    # Level 1: cheap enough that the smaller upload clearly pays off for screenshots.
+    if not compress or len(body) <= _GZIP_MIN_BYTES:
+        return body
+    headers["Content-Encoding"] = "gzip"
+    return gzip.compress(body, compresslevel=1)
+
+
+def _read_decoded(resp: http.client.HTTPResponse) -> bytes:
+    data = resp.read()
+    if resp.headers.get("Content-Encoding", "").lower() == "gzip":
+        return gzip.decompress(data)
+    return data
+
+
+class _Deferred:
+    """Log argument whose text is built on first str(), i.e. on the log listener thread."""
+
+    __slots__ = ("_build",)
+
+    def __init__(self, build: Callable[[], str]) -> None:
+        self._build = build
+
+    def __str__(self) -> str:
+        return self._build()
+
+
+_LOG_RULE = "=" * 80
+
+
+def _redact_part(part: Any) -> Any:
+    if isinstance(part, dict) and part.get("type") == "image_url":
+        image_url = part.get("image_url")
+        if isinstance(image_url, dict) and isinstance(image_url.get("url"), str):
+            return dict(part, image_url=dict(image_url, url=summarize_data_image_url(image_url["url"])))
+    return part
+
+
+def shallow_redact(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Chat request copy with image data URLs summarized, for logging. Only the
+    top level, the message dicts and image-bearing content lists are copied;
+    everything else (text parts, tool calls, scalars) is shared with payload, so
+    the copy costs O(messages) regardless of screenshot size. The message dicts
+    are copied so later in-place pruning of the history does not alter it.
+    """
+    logged_payload = dict(payload)
+    logged_payload["messages"] = [
+        dict(m, content=[_redact_part(p) for p in m["content"]]) if isinstance(m.get("content"), list) else dict(m)
+        for m in payload["messages"]
+    ]
+    return logged_payload
+
+
+def _redact_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    logged_payload = shallow_redact(payload)
+    messages = logged_payload["messages"]
+
+    logged_payload["tools"] = "[TOOLS DEFINITIONS TRUNCATED FOR LOG READABILITY]"
+    messages[0]["content"] = "[SYSTEM PROMPT TRUNCATED FOR LOG READABILITY]"
+    messages[1]["content"] = "[INITIAL USER TASK PROMPT TRUNCATED FOR LOG READABILITY]"
+    return logged_payload
+
+
+def _format_request_log(logged_payload: Dict[str, Any]) -> str:
+    # # Compact & clean JSON dump (pretty base + remove useless brace/empty lines)
+    json_str = dumps_pretty(logged_payload)
+
+    # Skip empty/whitespace-only lines, lone brace/bracket lines (optional trailing
+    # comma) and pure comma lines: a set lookup on the stripped line, no regex.
+    clean_json = '\n'.join(
+        line for line in json_str.splitlines()
+        if line.strip() not in _BRACKET_LINES
     )
+    return "\n".join((_LOG_RULE, "REQUEST TO MODEL:", _LOG_RULE, clean_json, ""))  # blank line separator
+
+
+def _format_response_log(response: Dict[str, Any]) -> str:
+    json_str = dumps_pretty(response)
+    return "\n".join((_LOG_RULE, "RESPONSE FROM MODEL:", _LOG_RULE, json_str, "\n"))
+
+
+def post_json(
+    payload: Dict[str, Any],
+    endpoint: str,
+    timeout: int,
+    stream: bool = False,
+    precoded: Optional[Dict[str, bytes]] = None,
+    on_tool_name: Optional[Callable[[str], None]] = None,
+    compress: bool = False,
+) -> Dict[str, Any]:
+    """
+    POST a chat completion request. With stream=True the request asks for SSE
+    and the streamed deltas are reassembled, so callers always receive the
+    non-streaming response shape. `precoded` maps top-level keys to values
+    that are already JSON-encoded bytes (see dumps_with_precoded).
+    on_tool_name is called with each tool name as soon as it is streamed.
+    compress=True gzips bodies over _GZIP_MIN_BYTES (the server must accept
+    Content-Encoding: gzip); non-streamed responses may come back gzipped.
+    """
+    log = _http_logger if _http_logger is not None and _http_logger.isEnabledFor(logging.INFO) else None
+
+    # Log request: redact now (a snapshot the caller may keep mutating), format later.
+    if log:
+        log.info("%s", _Deferred(functools.partial(_format_request_log, _redact_request(payload))))
     
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        response = json.loads(resp.read().decode("utf-8"))
+    headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+    if stream:
+        headers["Accept"] = "text/event-stream"
+        data = _maybe_gzip(dumps_with_precoded(dict(payload, stream=True), precoded), headers, compress)
+        response = _http_post(
+            endpoint, data, headers, timeout, lambda resp: _read_sse_completion(resp, on_tool_name)
+        )
+    else:
+        headers["Accept-Encoding"] = "gzip"
+        data = _maybe_gzip(dumps_with_precoded(payload, precoded), headers, compress)
+        response = loads(_http_post(endpoint, data, headers, timeout, _read_decoded))
     
-    # Log response
-    if _http_logger:
-        _http_logger.info("=" * 80)
-        _http_logger.info("RESPONSE FROM MODEL:")
-        _http_logger.info("=" * 80)
-        _http_logger.info(json.dumps(response, indent=2, ensure_ascii=True))
-        _http_logger.info("\n")
+    # Log response (copied: the message dict lives on in the agent history and gets pruned)
+    if log:
+        log.info("%s", _Deferred(functools.partial(_format_response_log, redact_base64_images(response))))
     
     return response
 
 
+async def post_json_async(
+    payload: Dict[str, Any],
+    endpoint: str,
+    timeout: int,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Awaitable post_json (same arguments and result) for running several
+    completions concurrently, e.g. with asyncio.gather. Each call runs on a
+    worker thread with its own pooled keep-alive connection, so N requests take
+    about one round-trip instead of N. Callbacks such as on_tool_name fire on
+    that worker thread.
+    """
+    return await asyncio.to_thread(post_json, payload, endpoint, timeout, **kwargs)
+
+
 # -----------------------------
 # Env helpers (used in main.py)
 # -----------------------------
 
 def get_env_str(name: str, default: str) -> str:
-    import os
     v = os.environ.get(name, "").strip()
-    return v if v else default
+    return v or default
 
 
 def get_env_int(name: str, default: int) -> int:
-    import os
+    """Malformed values fall back to the default instead of aborting startup."""
     v = os.environ.get(name, "").strip()
-    return default if not v else int(v)
+    try:
+        return int(v) if v else default
+    except ValueError:
+        return default
 
 
 def get_env_float(name: str, default: float) -> float:
-    import os
+    """Malformed values fall back to the default instead of aborting startup."""
     v = os.environ.get(name, "").strip()
-    return default if not v else float(v)
+    try:
+        return float(v) if v else default
+    except ValueError:
+        return default
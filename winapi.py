@@ -3,12 +3,20 @@
 from __future__ import annotations
 
 import ctypes
+import io
 import struct
 import time
 import zlib
 from ctypes import wintypes
 from typing import Tuple
 
+try:
+    from PIL import Image  # optional: JPEG screenshots (PNG is encoded by hand below)
+except ImportError:
+    Image = None
+
+JPEG_AVAILABLE = Image is not None
+
 # Some Python builds have incomplete wintypes; define missing aliases defensively.
 if not hasattr(wintypes, "HCURSOR"):
     wintypes.HCURSOR = wintypes.HANDLE
@@ -137,6 +145,12 @@ user32.GetSystemMetrics.restype = wintypes.INT
 user32.GetCursorInfo.argtypes = [ctypes.POINTER(CURSORINFO)]
 user32.GetCursorInfo.restype = wintypes.BOOL
 
+user32.GetCursorPos.argtypes = [ctypes.POINTER(POINT)]
+user32.GetCursorPos.restype = wintypes.BOOL
+
+user32.GetForegroundWindow.argtypes = []
+user32.GetForegroundWindow.restype = wintypes.HWND
+
 user32.GetIconInfo.argtypes = [wintypes.HICON, ctypes.POINTER(ICONINFO)]
 user32.GetIconInfo.restype = wintypes.BOOL
 
@@ -220,6 +234,34 @@ def move_mouse_to_pixel(x: int, y: int) -> None:
     user32.SetCursorPos(int(x), int(y))
 
 
+def input_snapshot() -> Tuple[int, int, int]:
+    """(cursor x, cursor y, foreground window handle)."""
+    pt = POINT()
+    user32.GetCursorPos(ctypes.byref(pt))
+    return int(pt.x), int(pt.y), int(user32.GetForegroundWindow() or 0)
+
+
+def wait_input_change(before: Tuple[int, int, int], max_wait: float, interval: float = 0.01) -> bool:
+    """
+    Wait for the UI to react to an input: poll every `interval` seconds until the
+    cursor position or foreground window differs from `before` (an input_snapshot()
+    taken just before the action), or until max_wait has passed.
+
+    Only an observed change ends the wait early (e.g. a click that opens or focuses
+    a window). Two equal snapshots prove nothing - SetCursorPos is synchronous and
+    focus changes land well after a few ms - so without a change this is a plain
+    max_wait delay. Returns True if a change was seen.
+    """
+    deadline = time.perf_counter() + max_wait
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        if input_snapshot() != before:
+            return True
+
+
 def _draw_cursor_on_dc(hdc_mem: int, screen_w: int, screen_h: int, dst_w: int, dst_h: int) -> None:
     ci = CURSORINFO()
     ci.cbSize = ctypes.sizeof(CURSORINFO)
@@ -270,10 +312,10 @@ def _rgb_to_png_bytes(rgb: bytes, width: int, height: int) -> bytes:
     return bytes(png)
 
 
-def capture_screenshot_png(target_w: int, target_h: int) -> Tuple[bytes, int, int]:
+def _grab_bgra(target_w: int, target_h: int) -> Tuple[bytes, int, int]:
     """
-    Capture the screen into PNG, scaled to target_w x target_h.
-    Returns: (png_bytes, screen_w, screen_h)
+    Capture the screen scaled to target_w x target_h as top-down BGRA32 pixels.
+    Returns: (bgra_bytes, screen_w, screen_h)
     """
     screen_w, screen_h = get_screen_size()
 
@@ -330,6 +372,15 @@ def capture_screenshot_png(target_w: int, target_h: int) -> Tuple[bytes, int, in
     gdi32.DeleteObject(hbm)
     gdi32.DeleteDC(hdc_mem)
     user32.ReleaseDC(None, hdc_screen)
+    return raw_bytes, screen_w, screen_h
+
+
+def capture_screenshot_png(target_w: int, target_h: int) -> Tuple[bytes, int, int]:
+    """
+    Capture the screen into PNG, scaled to target_w x target_h.
+    Returns: (png_bytes, screen_w, screen_h)
+    """
+    raw_bytes, screen_w, screen_h = _grab_bgra(target_w, target_h)
 
     # BGRA -> RGB
     rgb = bytearray(target_w * target_h * 3)
@@ -345,6 +396,21 @@ def capture_screenshot_png(target_w: int, target_h: int) -> Tuple[bytes, int, in
     return png_bytes, screen_w, screen_h
 
 
+def capture_screenshot_jpeg(target_w: int, target_h: int, quality: int = 85) -> Tuple[bytes, int, int]:
+    """
+    Capture the screen into JPEG (requires Pillow), scaled to target_w x target_h.
+    Pillow reads the BGRA buffer directly, so no per-pixel conversion in Python.
+    Returns: (jpeg_bytes, screen_w, screen_h)
+    """
+    if Image is None:
+        raise RuntimeError("JPEG capture requires Pillow")
+    raw_bytes, screen_w, screen_h = _grab_bgra(target_w, target_h)
+    img = Image.frombuffer("RGB", (target_w, target_h), raw_bytes, "raw", "BGRX", 0, 1)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality, optimize=False)
+    return buf.getvalue(), screen_w, screen_h
+
+
 def _send_input(inputs) -> None:
     n = len(inputs)
     arr = (INPUT * n)(*inputs)